@@ -7,10 +7,14 @@ For every random image, a second version is produced where the same
 boxes are repositioned to remove any overlaps.
 """
 
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 from PIL import Image, ImageDraw
 
 # Colors: red, green, blue, orange, yellow
@@ -21,11 +25,21 @@ COLORS = {
     'orange': (255, 165, 0),
     'yellow': (255, 255, 0)
 }
+COLOR_RANK = {name: rank for rank, name in enumerate(COLORS)}
+# Fixed PNG palette: index 0 is the white background, 1 the black outline
+PALETTE = [
+    channel
+    for rgb in [(255, 255, 255), (0, 0, 0), *COLORS.values()]
+    for channel in rgb
+]
+PALETTE_INDEX = {name: idx for idx, name in enumerate(COLORS, start=2)}
 
 # Image dimensions
 IMAGE_WIDTH = 800
 IMAGE_HEIGHT = 600
 OUTLINE_WIDTH = 2  # keep in sync with draw operations
+GRID_CELL = 100  # spatial hash cell size, roughly 2x the average box side
+FALLBACK_STEP = 5  # occupancy mask resolution for the fallback placement search
 
 
 def create_random_boxes() -> List[Dict[str, int]]:
@@ -47,25 +61,60 @@ def create_random_boxes() -> List[Dict[str, int]]:
     return boxes
 
 
-def boxes_overlap(box_a: Dict[str, int], box_b: Dict[str, int]) -> bool:
-    """Return True if two axis-aligned boxes overlap."""
-    a_left, a_top = box_a['x'], box_a['y']
-    a_right, a_bottom = a_left + box_a['width'], a_top + box_a['height']
-
-    b_left, b_top = box_b['x'], box_b['y']
-    b_right, b_bottom = b_left + box_b['width'], b_top + box_b['height']
-
-    if a_right <= b_left or a_left >= b_right:
-        return False
-    if a_bottom <= b_top or a_top >= b_bottom:
-        return False
-    return True
+def _cells_for(box: Dict[str, int]) -> Iterator[Tuple[int, int]]:
+    """Yield the spatial hash cells touched by a box."""
+    for cx in range(box['x'] // GRID_CELL, (box['x'] + box['width']) // GRID_CELL + 1):
+        for cy in range(box['y'] // GRID_CELL, (box['y'] + box['height']) // GRID_CELL + 1):
+            yield cx, cy
+
+
+def _find_free_position(
+    width: int,
+    height: int,
+    xs: np.ndarray,
+    ys: np.ndarray,
+    ws: np.ndarray,
+    hs: np.ndarray,
+) -> Optional[Tuple[int, int]]:
+    """Return the first free (x, y) on a FALLBACK_STEP grid, scanning rows top-down.
+
+    Placed boxes are rasterized onto a coarse occupancy mask (partially
+    covered cells count as occupied) and every window of the box's size is
+    tested at once with a sliding window view.
+    """
+    step = FALLBACK_STEP
+    occupied = np.zeros((IMAGE_HEIGHT // step, IMAGE_WIDTH // step), dtype=bool)
+    for x, y, w, h in zip(xs, ys, ws, hs):
+        occupied[y // step:-(-(y + h) // step), x // step:-(-(x + w) // step)] = True
+
+    cells_h, cells_w = -(-height // step), -(-width // step)
+    if cells_h > occupied.shape[0] or cells_w > occupied.shape[1]:
+        return None
+    windows = np.lib.stride_tricks.sliding_window_view(occupied, (cells_h, cells_w))
+    free = np.argwhere(~windows.any(axis=(2, 3)))
+    if free.size == 0:
+        return None
+    cy, cx = free[0]
+    return int(cx) * step, int(cy) * step
 
 
 def arrange_boxes_without_overlap(boxes: List[Dict[str, int]]) -> List[Dict[str, int]]:
-    """Return a new list of boxes repositioned to avoid overlaps."""
+    """Return a new list of boxes repositioned to avoid overlaps.
+
+    Uses bottom-left placement: boxes are placed largest first at the
+    lowest (y, x) candidate corner where they fit. Every placement adds
+    the corners to its right and below as new candidates. If no corner
+    fits, an occupancy-mask grid search is used as a fallback.
+    """
     boxes_copy = [box.copy() for box in boxes]
-    placed_boxes: List[Dict[str, int]] = []
+    # Placed boxes as parallel arrays so overlap tests run as one vector op
+    xs = np.empty(len(boxes_copy), dtype=np.int32)
+    ys = np.empty(len(boxes_copy), dtype=np.int32)
+    ws = np.empty(len(boxes_copy), dtype=np.int32)
+    hs = np.empty(len(boxes_copy), dtype=np.int32)
+    placed_count = 0
+    grid: Dict[Tuple[int, int], List[int]] = {}  # cell -> indices into the placed arrays
+    candidates = {(0, 0)}  # (y, x) corners, sorted so the top-left-most wins
 
     order = sorted(
         range(len(boxes_copy)),
@@ -77,37 +126,49 @@ def arrange_boxes_without_overlap(boxes: List[Dict[str, int]]) -> List[Dict[str,
         box = boxes_copy[idx]
         placed = False
 
-        for _ in range(500):
-            x = random.randint(0, IMAGE_WIDTH - box['width'])
-            y = random.randint(0, IMAGE_HEIGHT - box['height'])
+        for y, x in sorted(candidates):
+            if x + box['width'] > IMAGE_WIDTH or y + box['height'] > IMAGE_HEIGHT:
+                continue
             box['x'], box['y'] = x, y
-
-            if all(not boxes_overlap(box, other) for other in placed_boxes):
+            nearby = {i for cell in _cells_for(box) for i in grid.get(cell, ())}
+            near = np.fromiter(nearby, dtype=np.intp, count=len(nearby))
+            overlaps = ~(
+                (xs[near] + ws[near] <= x) | (xs[near] >= x + box['width'])
+                | (ys[near] + hs[near] <= y) | (ys[near] >= y + box['height'])
+            )
+            if not overlaps.any():
                 placed = True
                 break
 
         if not placed:
-            # Fallback: deterministic grid search to guarantee placement
-            step = 5
-            for y in range(0, IMAGE_HEIGHT - box['height'] + 1, step):
-                if placed:
-                    break
-                for x in range(0, IMAGE_WIDTH - box['width'] + 1, step):
-                    box['x'], box['y'] = x, y
-                    if all(not boxes_overlap(box, other) for other in placed_boxes):
-                        placed = True
-                        break
-
-        if not placed:
-            raise RuntimeError('Unable to place box without overlap')
-
-        placed_boxes.append(box)
-
-    color_order = list(COLORS.keys())
-    ordered_boxes = sorted(
-        boxes_copy,
-        key=lambda box: color_order.index(box['color_name'])
-    )
+            position = _find_free_position(
+                box['width'],
+                box['height'],
+                xs[:placed_count],
+                ys[:placed_count],
+                ws[:placed_count],
+                hs[:placed_count],
+            )
+            if position is None:
+                raise RuntimeError('Unable to place box without overlap')
+            box['x'], box['y'] = position
+
+        for cell in _cells_for(box):
+            grid.setdefault(cell, []).append(placed_count)
+        xs[placed_count], ys[placed_count] = box['x'], box['y']
+        ws[placed_count], hs[placed_count] = box['width'], box['height']
+        placed_count += 1
+
+        # Drop corners now covered by the new box; they can never host another one
+        right, bottom = box['x'] + box['width'], box['y'] + box['height']
+        candidates = {
+            (y, x) for y, x in candidates
+            if not (box['x'] <= x < right and box['y'] <= y < bottom)
+        }
+        candidates.add((box['y'], right))
+        candidates.add((bottom, box['x']))
+
+    ordered_boxes = sorted(boxes_copy, key=lambda box: COLOR_RANK[box['color_name']])
     return ordered_boxes
 
 
@@ -131,29 +192,44 @@ def compute_bounds(boxes: List[Dict[str, int]]) -> Dict[str, int]:
 
 
 def draw_boxes(boxes: List[Dict[str, int]], output_path: Path) -> None:
-    """Draw boxes on an image, crop to their combined bounds, and save."""
-    img = Image.new('RGB', (IMAGE_WIDTH, IMAGE_HEIGHT), color='white')
+    """Draw boxes on a canvas sized to their combined bounds and save."""
+    bounds = compute_bounds(boxes)
+    left, top = bounds['left'], bounds['top']
+    img = Image.new(
+        'P',
+        (bounds['right'] - left, bounds['bottom'] - top),
+        color=0,
+    )
+    img.putpalette(PALETTE)
     draw = ImageDraw.Draw(img)
     for box in boxes:
         draw.rectangle(
             [
-                box['x'],
-                box['y'],
-                box['x'] + box['width'],
-                box['y'] + box['height'],
+                box['x'] - left,
+                box['y'] - top,
+                box['x'] + box['width'] - left,
+                box['y'] + box['height'] - top,
             ],
-            fill=box['color'],
-            outline='black',
+            fill=PALETTE_INDEX[box['color_name']],
+            outline=1,
             width=OUTLINE_WIDTH,
         )
 
-    bounds = compute_bounds(boxes)
-    cropped = img.crop((bounds['left'], bounds['top'], bounds['right'], bounds['bottom']))
-    cropped.save(output_path, 'PNG')
+    img.save(output_path, 'PNG', compress_level=1, optimize=False)
+
 
+def generate_images_for_index(
+    image_number: int,
+    images_dir: Path,
+    images_no_overlap_dir: Path,
+    seed: int,
+) -> None:
+    """Generate overlapping and non-overlapping versions for a given index.
 
-def generate_images_for_index(image_number: int, images_dir: Path, images_no_overlap_dir: Path) -> None:
-    """Generate overlapping and non-overlapping versions for a given index."""
+    Runs inside a worker process, so the global ``random`` state is seeded
+    per index to keep the output reproducible regardless of scheduling.
+    """
+    random.seed(seed + image_number)
     filename = f"image_{image_number:03d}.png"
 
     boxes = create_random_boxes()
@@ -163,8 +239,8 @@ def generate_images_for_index(image_number: int, images_dir: Path, images_no_ove
     draw_boxes(boxes_no_overlap, images_no_overlap_dir / filename)
 
 
-def main():
-    """Generate 100 PNG images with colored boxes."""
+def main(seed: Optional[int] = None):
+    """Generate 100 PNG images with colored boxes across all CPU cores."""
     script_dir = Path(__file__).parent
     images_dir = script_dir / "images"
     images_dir.mkdir(exist_ok=True)
@@ -175,10 +251,23 @@ def main():
     print(f"Generating 100 images in: {images_dir}")
     print(f"Generating 100 non-overlapping images in: {images_without_overlap_dir}")
 
-    for i in range(1, 101):
-        generate_images_for_index(i, images_dir, images_without_overlap_dir)
-        if i % 10 == 0:
-            print(f"Generated {i}/100 image pairs...")
+    if seed is None:
+        seed = random.randrange(2**32)
+    print(f"Using seed: {seed}")
+
+    indices = range(1, 101)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(
+            generate_images_for_index,
+            indices,
+            repeat(images_dir),
+            repeat(images_without_overlap_dir),
+            repeat(seed),
+            chunksize=4,
+        )
+        for done, _ in enumerate(results, start=1):
+            if done % 10 == 0:
+                print(f"Generated {done}/100 image pairs...")
 
     print("\n✓ Successfully generated 100 PNG files in both folders")
     print(f"  Overlapping images: {images_dir} (image_001.png .. image_100.png)")
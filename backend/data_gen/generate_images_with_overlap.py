@@ -1,111 +1,35 @@
 #!/usr/bin/env python3
 """
-Script to generate 100 PNG images with colored boxes using tkinter.
+Script to generate 100 PNG images with colored boxes using PIL.
 Each image contains boxes in red, green, blue, orange, and yellow with different sizes.
 """
 
-import os
 import random
-import tkinter as tk
 from pathlib import Path
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageDraw
 
-# Colors: red, green, blue, orange, yellow
-COLORS = {
-    'red': '#FF0000',
-    'green': '#00FF00',
-    'blue': '#0000FF',
-    'orange': '#FFA500',
-    'yellow': '#FFFF00'
-}
+from generate_images import COLORS, IMAGE_WIDTH, IMAGE_HEIGHT
 
-# Image dimensions
-IMAGE_WIDTH = 800
-IMAGE_HEIGHT = 600
 
-
-def generate_image_with_tkinter(image_number, output_dir):
-    """
-    Generate a single image with 5 colored boxes using tkinter Canvas.
-    
-    Args:
-        image_number: The image number (for filename)
-        output_dir: Directory to save the image
-    """
-    # Create a hidden tkinter window
-    root = tk.Tk()
-    root.withdraw()  # Hide the window
-    
-    # Create a canvas
-    canvas = tk.Canvas(root, width=IMAGE_WIDTH, height=IMAGE_HEIGHT, bg='white')
-    canvas.pack()
-    
-    # Generate 5 boxes with different sizes
-    color_list = list(COLORS.keys())
-    
-    for color_name in color_list:
-        # Random box size (between 50x50 and 200x200)
-        box_width = random.randint(50, 200)
-        box_height = random.randint(50, 200)
-        
-        # Random position (ensuring box fits within image)
-        x = random.randint(0, IMAGE_WIDTH - box_width)
-        y = random.randint(0, IMAGE_HEIGHT - box_height)
-        
-        # Draw rectangle on canvas
-        canvas.create_rectangle(
-            x, y, x + box_width, y + box_height,
-            fill=COLORS[color_name],
-            outline='black',
-            width=2
-        )
-    
-    # Save canvas as PNG using postscript conversion
-    filename = f"image_{image_number:03d}.png"
-    filepath = output_dir / filename
-    
-    # Export canvas to postscript, then convert to PNG
-    canvas.postscript(file=str(filepath).replace('.png', '.eps'), colormode='color')
-    
-    # Convert EPS to PNG using PIL
-    img = Image.open(str(filepath).replace('.png', '.eps'))
-    img.save(filepath, 'PNG')
-    
-    # Clean up EPS file
-    eps_file = filepath.with_suffix('.eps')
-    if eps_file.exists():
-        eps_file.unlink()
-    
-    root.destroy()
-    return filepath
-
-
-def generate_image_pil(image_number, output_dir):
+def generate_image_pil(image_number, output_dir, canvas=None):
     """
-    Generate a single image with 5 colored boxes using PIL (more reliable).
-    This is the recommended method.
+    Generate a single image with 5 colored boxes using PIL.
     
     Args:
         image_number: The image number (for filename)
         output_dir: Directory to save the image
+        canvas: Optional reusable IMAGE_WIDTH x IMAGE_HEIGHT RGB image; it is
+            repainted white instead of allocating a new image per call
     """
-    # Create a new image with white background
-    img = Image.new('RGB', (IMAGE_WIDTH, IMAGE_HEIGHT), color='white')
+    if canvas is None:
+        img = Image.new('RGB', (IMAGE_WIDTH, IMAGE_HEIGHT), color='white')
+    else:
+        img = canvas
+        img.paste((255, 255, 255), (0, 0, IMAGE_WIDTH, IMAGE_HEIGHT))
     draw = ImageDraw.Draw(img)
     
-    # Color mapping for PIL (RGB tuples)
-    color_map = {
-        'red': (255, 0, 0),
-        'green': (0, 255, 0),
-        'blue': (0, 0, 255),
-        'orange': (255, 165, 0),
-        'yellow': (255, 255, 0)
-    }
-    
     # Generate 5 boxes with different sizes
-    color_list = list(COLORS.keys())
-    
-    for color_name in color_list:
+    for color_value in COLORS.values():
         # Random box size (between 50x50 and 200x200)
         box_width = random.randint(50, 200)
         box_height = random.randint(50, 200)
@@ -117,7 +41,7 @@ def generate_image_pil(image_number, output_dir):
         # Draw rectangle
         draw.rectangle(
             [x, y, x + box_width, y + box_height],
-            fill=color_map[color_name],
+            fill=color_value,
             outline='black',
             width=2
         )
@@ -125,7 +49,8 @@ def generate_image_pil(image_number, output_dir):
     # Save the image
     filename = f"image_{image_number:03d}.png"
     filepath = output_dir / filename
-    img.save(filepath, 'PNG')
+    # Fast zlib level: the flat-color boxes compress well even at level 1
+    img.save(filepath, 'PNG', compress_level=1, optimize=False)
     
     return filepath
 
@@ -139,13 +64,11 @@ def main():
     
     print(f"Generating 100 images in: {images_dir}")
     print("Each image will contain 5 boxes (red, green, blue, orange, yellow) with different sizes...")
-    print("Using PIL method (more reliable than tkinter for image generation)...")
     
-    # Generate 100 images
-    # Note: Using PIL method as it's more reliable for batch generation
-    # Tkinter method is available but slower and requires GUI backend
+    # Generate 100 images, reusing one canvas for the whole batch
+    canvas = Image.new('RGB', (IMAGE_WIDTH, IMAGE_HEIGHT), color='white')
     for i in range(1, 101):
-        filepath = generate_image_pil(i, images_dir)
+        filepath = generate_image_pil(i, images_dir, canvas)
         if i % 10 == 0:
             print(f"Generated {i}/100 images...")
     
@@ -4,9 +4,14 @@ Generate rectpack-based packing “solutions” for the images in ./images.
 
 For every source PNG (with five colored boxes) we:
 1. Detect the rectangles by color.
-2. Feed their widths/heights to rectpack to obtain a compact packing.
+2. Feed their widths/heights to a packer to obtain a compact packing (a numba-compiled
+   guillotine packer for small inputs, rectpack for larger ones).
 3. Render the packed layout into ./solutions (mirror filenames).
 
+Requirements:
+    pip install -r requirements.txt   (in this directory: numpy, Pillow, rectpack, numba)
+    numba is optional; without it the guillotine packer runs as plain (much slower) Python.
+
 Usage:
     python solutions_gen.py
     python solutions_gen.py --source images --output solutions --limit 10
@@ -14,17 +19,21 @@ Usage:
 
 import argparse
 import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from typing import Dict, List
 
+import numpy as np
 from PIL import Image, ImageDraw
 
 try:
-    from rectpack import newPacker
-except ImportError as exc:  # pragma: no cover - fail fast when dependency missing
-    raise SystemExit(
-        "rectpack is required. Install it with `pip install rectpack`."
-    ) from exc
+    from numba import njit
+except ImportError:  # pragma: no cover - run the packer as plain Python instead
+
+    def njit(*_args, **_kwargs):
+        return lambda func: func
 
 # Colors used in the generated datasets
 COLORS = {
@@ -34,39 +43,46 @@ COLORS = {
     "orange": (255, 165, 0),
     "yellow": (255, 255, 0),
 }
-COLOR_LOOKUP = {rgb: name for name, rgb in COLORS.items()}
-COLOR_ORDER = list(COLORS.keys())
+# RGB triplets packed into a single int in little-endian byte order
+# (r | g << 8 | b << 16), matching an RGBX pixel buffer viewed as uint32
+COLOR_CODES = {name: r | (g << 8) | (b << 16) for name, (r, g, b) in COLORS.items()}
+COLOR_RANK = {name: rank for rank, name in enumerate(COLORS)}
+# Fixed PNG palette: index 0 is the white background, 1 the black outline
+PALETTE = [
+    channel
+    for rgb in [(255, 255, 255), (0, 0, 0), *COLORS.values()]
+    for channel in rgb
+]
+PALETTE_INDEX = {name: idx for idx, name in enumerate(COLORS, start=2)}
 
 IMAGE_WIDTH = 800
 IMAGE_HEIGHT = 600
 OUTLINE_WIDTH = 2  # matches generate_images.py
+MAX_JIT_BOXES = 32  # larger inputs go through rectpack instead
 
 
 def extract_boxes(image_path: Path) -> List[Dict[str, int]]:
     """Read an existing image and recover the colored rectangles."""
-    img = Image.open(image_path).convert("RGB")
-    width, height = img.size
-    pixels = img.load()
-
-    bounds = {
-        name: {"min_x": width, "max_x": -1, "min_y": height, "max_y": -1}
-        for name in COLORS
-    }
-
-    for y in range(height):
-        for x in range(width):
-            color_name = COLOR_LOOKUP.get(pixels[x, y])
-            if color_name is None:
-                continue
-            data = bounds[color_name]
-            if x < data["min_x"]:
-                data["min_x"] = x
-            if x > data["max_x"]:
-                data["max_x"] = x
-            if y < data["min_y"]:
-                data["min_y"] = y
-            if y > data["max_y"]:
-                data["max_y"] = y
+    # Decode as RGBX so each pixel is 4 bytes that can be reinterpreted as one
+    # uint32 without copying; masking drops the padding byte
+    arr = np.asarray(Image.open(image_path).convert("RGBX"))
+    height, width = arr.shape[:2]
+    codes = arr.view("<u4")[..., 0] & 0xFFFFFF
+
+    bounds = {}
+    for name, code in COLOR_CODES.items():
+        mask = codes == code
+        ys = np.flatnonzero(mask.any(axis=1))
+        if ys.size == 0:
+            bounds[name] = {"min_x": width, "max_x": -1, "min_y": height, "max_y": -1}
+            continue
+        xs = np.flatnonzero(mask.any(axis=0))
+        bounds[name] = {
+            "min_x": int(xs[0]),
+            "max_x": int(xs[-1]),
+            "min_y": int(ys[0]),
+            "max_y": int(ys[-1]),
+        }
 
     boxes: List[Dict[str, int]] = []
     for color_name, data in bounds.items():
@@ -112,10 +128,100 @@ def compute_bounds(boxes: List[Dict[str, int]]) -> Dict[str, int]:
     return {"left": min_x, "top": min_y, "right": max_x, "bottom": max_y}
 
 
-def try_pack_in_bin(
+@njit(cache=True)
+def guillotine_baf_pack(widths, heights, bin_w, bin_h):
+    """Guillotine best-area-fit packing of (widths, heights) into one bin.
+
+    Boxes are placed largest area first, each in the free rectangle that
+    leaves the least unused area (rotation allowed), and the leftover space
+    is split along the shorter leftover axis. Returns ``(xs, ys, rotated,
+    placed_count)``; packing stops at the first box that does not fit.
+    """
+    n = widths.shape[0]
+    xs = np.zeros(n, dtype=np.int32)
+    ys = np.zeros(n, dtype=np.int32)
+    rotated = np.zeros(n, dtype=np.bool_)
+
+    # Each placement consumes one free rectangle and adds at most two
+    free_x = np.zeros(n + 1, dtype=np.int32)
+    free_y = np.zeros(n + 1, dtype=np.int32)
+    free_w = np.zeros(n + 1, dtype=np.int32)
+    free_h = np.zeros(n + 1, dtype=np.int32)
+    free_w[0] = bin_w
+    free_h[0] = bin_h
+    free_count = 1
+
+    areas = widths.astype(np.int64) * heights.astype(np.int64)
+    order = np.argsort(-areas)
+
+    for k in range(n):
+        i = order[k]
+        best = -1
+        best_fit = np.int64(-1)
+        best_rot = False
+        for j in range(free_count):
+            for rot in range(2):
+                w = widths[i] if rot == 0 else heights[i]
+                h = heights[i] if rot == 0 else widths[i]
+                if w > free_w[j] or h > free_h[j]:
+                    continue
+                fit = np.int64(free_w[j]) * free_h[j] - areas[i]
+                if best < 0 or fit < best_fit:
+                    best = j
+                    best_fit = fit
+                    best_rot = rot == 1
+        if best < 0:
+            return xs, ys, rotated, k
+
+        w = heights[i] if best_rot else widths[i]
+        h = widths[i] if best_rot else heights[i]
+        fx, fy, fw, fh = free_x[best], free_y[best], free_w[best], free_h[best]
+        xs[i] = fx
+        ys[i] = fy
+        rotated[i] = best_rot
+
+        if fw - w < fh - h:
+            # Horizontal cut: the strip below spans the full free width
+            right_w, right_h = fw - w, h
+            below_w, below_h = fw, fh - h
+        else:
+            # Vertical cut: the strip to the right spans the full free height
+            right_w, right_h = fw - w, fh
+            below_w, below_h = w, fh - h
+
+        free_count -= 1
+        free_x[best] = free_x[free_count]
+        free_y[best] = free_y[free_count]
+        free_w[best] = free_w[free_count]
+        free_h[best] = free_h[free_count]
+        if right_w > 0 and right_h > 0:
+            free_x[free_count] = fx + w
+            free_y[free_count] = fy
+            free_w[free_count] = right_w
+            free_h[free_count] = right_h
+            free_count += 1
+        if below_w > 0 and below_h > 0:
+            free_x[free_count] = fx
+            free_y[free_count] = fy + h
+            free_w[free_count] = below_w
+            free_h[free_count] = below_h
+            free_count += 1
+
+    return xs, ys, rotated, n
+
+
+def _pack_with_rectpack(
     boxes: List[Dict[str, int]], width: int, height: int
-) -> tuple[list[Dict[str, int]], int] | None:
-    """Attempt to pack boxes into a specific bin. Return placements and used area."""
+) -> List[tuple[int, int, int, int, int]] | None:
+    """Pack with rectpack and return (x, y, w, h, box_index) per box."""
+    try:
+        # Only needed for box sets too large for the JIT packer
+        from rectpack import newPacker
+    except ImportError as exc:  # pragma: no cover - fail fast when dependency missing
+        raise SystemExit(
+            "rectpack is required. Install it with `pip install rectpack`."
+        ) from exc
+
     packer = newPacker(rotation=True)
 
     for idx, box in enumerate(boxes):
@@ -127,9 +233,41 @@ def try_pack_in_bin(
     rects = packer.rect_list()
     if len(rects) < len(boxes):
         return None
+    return [(x, y, w, h, rid) for _, x, y, w, h, rid in rects]
+
+
+def _pack_with_guillotine(
+    boxes: List[Dict[str, int]], width: int, height: int
+) -> List[tuple[int, int, int, int, int]] | None:
+    """Pack with the JIT guillotine packer and return (x, y, w, h, box_index) per box."""
+    widths = np.array([box["width"] for box in boxes], dtype=np.int32)
+    heights = np.array([box["height"] for box in boxes], dtype=np.int32)
+    xs, ys, rotated, placed = guillotine_baf_pack(widths, heights, width, height)
+    if placed < len(boxes):
+        return None
+
+    rects = []
+    for idx in range(len(boxes)):
+        w, h = int(widths[idx]), int(heights[idx])
+        if rotated[idx]:
+            w, h = h, w
+        rects.append((int(xs[idx]), int(ys[idx]), w, h, idx))
+    return rects
+
+
+def try_pack_in_bin(
+    boxes: List[Dict[str, int]], width: int, height: int
+) -> tuple[list[Dict[str, int]], int] | None:
+    """Attempt to pack boxes into a specific bin. Return placements and used area."""
+    if len(boxes) <= MAX_JIT_BOXES:
+        rects = _pack_with_guillotine(boxes, width, height)
+    else:
+        rects = _pack_with_rectpack(boxes, width, height)
+    if rects is None:
+        return None
 
     placements: List[Dict[str, int]] = []
-    for _, x, y, w, h, rid in rects:
+    for x, y, w, h, rid in rects:
         source = boxes[rid]
         placements.append(
             {
@@ -149,46 +287,56 @@ def try_pack_in_bin(
     return placements, used_area
 
 
-def generate_candidate_bins(boxes: List[Dict[str, int]]) -> List[tuple[int, int]]:
-    """Generate bin sizes to test, ordered by theoretical area."""
+def generate_candidate_sizes(
+    boxes: List[Dict[str, int]]
+) -> tuple[List[int], List[int]]:
+    """Generate sorted bin widths and heights to test."""
     total_area = sum(box["width"] * box["height"] for box in boxes)
     max_width = max(box["width"] for box in boxes)
     max_height = max(box["height"] for box in boxes)
     base = int(math.ceil(math.sqrt(total_area)))
 
-    width_candidates = {
-        max_width,
-        base,
-        IMAGE_WIDTH,
-    }
-    height_candidates = {
-        max_height,
-        base,
-        IMAGE_HEIGHT,
-    }
-
-    for step in (25, 50, 100):
-        width_candidates.update(
-            range(max_width, IMAGE_WIDTH + 1, step)
-        )
-        height_candidates.update(
-            range(max_height, IMAGE_HEIGHT + 1, step)
-        )
+    width_candidates = {base, IMAGE_WIDTH}
+    height_candidates = {base, IMAGE_HEIGHT}
+    width_candidates.update(range(max_width, IMAGE_WIDTH + 1, 25))
+    height_candidates.update(range(max_height, IMAGE_HEIGHT + 1, 25))
 
-    widths = sorted(w for w in width_candidates if w <= IMAGE_WIDTH)
-    heights = sorted(h for h in height_candidates if h <= IMAGE_HEIGHT)
+    widths = sorted(w for w in width_candidates if max_width <= w <= IMAGE_WIDTH)
+    heights = sorted(h for h in height_candidates if max_height <= h <= IMAGE_HEIGHT)
+    return widths, heights
 
-    bins = {(w, h) for w in widths for h in heights if w >= max_width and h >= max_height}
-    return sorted(bins, key=lambda wh: wh[0] * wh[1])
+
+def pack_min_height(
+    boxes: List[Dict[str, int]], width: int, heights: List[int]
+) -> tuple[list[Dict[str, int]], int] | None:
+    """Binary-search the shortest candidate height that fits all boxes at this width."""
+    best: tuple[list[Dict[str, int]], int] | None = None
+    lo, hi = 0, len(heights) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        attempt = try_pack_in_bin(boxes, width, heights[mid])
+        if attempt is None:
+            lo = mid + 1
+        else:
+            best = attempt
+            hi = mid - 1
+    return best
 
 
 def pack_boxes(boxes: List[Dict[str, int]]) -> List[Dict[str, int]]:
-    """Use rectpack repeatedly to approximate the minimal bounding area."""
+    """Pack repeatedly over candidate bins to approximate the minimal bounding area.
+
+    For each candidate width only the heights at or above the area lower
+    bound are considered, and the shortest one that fits is found by
+    binary search instead of trying every (width, height) pair.
+    """
     best_result: tuple[list[Dict[str, int]], int] | None = None
     min_possible_area = sum(box["width"] * box["height"] for box in boxes)
+    widths, heights = generate_candidate_sizes(boxes)
 
-    for width, height in generate_candidate_bins(boxes):
-        attempt = try_pack_in_bin(boxes, width, height)
+    for width in widths:
+        feasible_heights = [h for h in heights if width * h >= min_possible_area]
+        attempt = pack_min_height(boxes, width, feasible_heights)
         if attempt is None:
             continue
 
@@ -205,33 +353,44 @@ def pack_boxes(boxes: List[Dict[str, int]]) -> List[Dict[str, int]]:
         best_result = fallback
 
     placements = best_result[0]
-    placements.sort(key=lambda box: COLOR_ORDER.index(box["color_name"]))
+    placements.sort(key=lambda box: COLOR_RANK[box["color_name"]])
     return placements
 
 
 def draw_boxes(boxes: List[Dict[str, int]], output_path: Path) -> None:
-    """Render rectangles to an image file cropped to their bounds."""
-    img = Image.new("RGB", (IMAGE_WIDTH, IMAGE_HEIGHT), color="white")
+    """Render rectangles to an image file sized to their bounds."""
+    bounds = compute_bounds(boxes)
+    left, top = bounds["left"], bounds["top"]
+    img = Image.new(
+        "P",
+        (bounds["right"] - left, bounds["bottom"] - top),
+        color=0,
+    )
+    img.putpalette(PALETTE)
     draw = ImageDraw.Draw(img)
 
     for box in boxes:
         draw.rectangle(
             [
-                box["x"],
-                box["y"],
-                box["x"] + box["width"] - 1,
-                box["y"] + box["height"] - 1,
+                box["x"] - left,
+                box["y"] - top,
+                box["x"] + box["width"] - 1 - left,
+                box["y"] + box["height"] - 1 - top,
             ],
-            fill=box["color"],
-            outline="black",
+            fill=PALETTE_INDEX[box["color_name"]],
+            outline=1,
             width=OUTLINE_WIDTH,
         )
 
-    bounds = compute_bounds(boxes)
-    cropped = img.crop(
-        (bounds["left"], bounds["top"], bounds["right"], bounds["bottom"])
-    )
-    cropped.save(output_path, "PNG")
+    img.save(output_path, "PNG", compress_level=1, optimize=False)
+
+
+def _process_one(image_path: Path, output_dir: Path) -> str:
+    """Extract, pack and render a single image; runs in a worker process."""
+    boxes = extract_boxes(image_path)
+    placement = pack_boxes(boxes)
+    draw_boxes(placement, output_dir / image_path.name)
+    return image_path.name
 
 
 def process_images(source_dir: Path, output_dir: Path, limit: int | None = None) -> None:
@@ -244,12 +403,12 @@ def process_images(source_dir: Path, output_dir: Path, limit: int | None = None)
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    for idx, image_path in enumerate(image_paths, start=1):
-        boxes = extract_boxes(image_path)
-        placement = pack_boxes(boxes)
-        draw_boxes(placement, output_dir / image_path.name)
-
-        print(f"[{idx}/{len(image_paths)}] Packed {image_path.name}")
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(
+            _process_one, image_paths, repeat(output_dir), chunksize=4
+        )
+        for idx, name in enumerate(results, start=1):
+            print(f"[{idx}/{len(image_paths)}] Packed {name}")
 
 
 def parse_args() -> argparse.Namespace:
@@ -1,13 +1,19 @@
 import os
+import json
 import base64
-import requests
-from typing import Optional, Tuple, Dict, Any, Union
-import yaml
+import functools
+from typing import TYPE_CHECKING, Optional, Tuple, Dict, Any, Union
 from pathlib import Path
 
+if TYPE_CHECKING:
+    import aiohttp
+
+# requests and yaml are imported on first use to keep worker start-up cheap
+
 def _get_model_from_yaml(yaml_path: Path) -> Optional[str]:
     if not yaml_path.exists():
         return None
+    import yaml
     data = yaml.safe_load(yaml_path.read_text())
     return data.get("model") if isinstance(data, dict) else None
 
@@ -19,22 +25,43 @@ def get_api_url(yaml_path: Path) -> str:
     else:
         return "https://api.bfl.ai/v1/flux-kontext-pro"
 
-API_URL = get_api_url(Path("config/prompt.yaml"))
+@functools.lru_cache(maxsize=1)
+def _session():
+    # Shared keep-alive pool so parallel candidates reuse TLS connections
+    import requests
+    from requests.adapters import HTTPAdapter
 
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+    return session
 
-def submit_generation(
-    prompt: Union[str, Dict[str, Any], Any],
-    aspect_ratio: str = "1:1",
-    input_image_path: Optional[str] = None,
-    api_key: Optional[str] = None,
-    extra_payload: Optional[Dict[str, Any]] = None,
-) -> Tuple[str, str]:
-    """Submit a generation/edit request and return (request_id, polling_url).
 
-    - If `input_image_path` is provided and exists, the image will be sent for image-to-image editing.
-    - If `api_key` is None, attempts to read from environment var `BFL_API_KEY`.
-    - `extra_payload` allows passing additional parameters supported by the API.
-    """
+@functools.lru_cache(maxsize=1)
+def _api_url() -> str:
+    # Resolved on first submission rather than at import time
+    return get_api_url(Path("config/prompt.yaml"))
+
+
+def encode_image_file(image_path: Union[str, Path]) -> str:
+    """Read an image file and return its base64 encoding as a string."""
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode("utf-8")
+
+
+@functools.lru_cache(maxsize=4)
+def _reference_image_b64(image_path: str) -> str:
+    # Reference images are static, so encode each one once per process
+    return encode_image_file(image_path)
+
+
+def _build_request(
+    prompt: Union[str, Dict[str, Any], Any],
+    aspect_ratio: str,
+    input_image_path: Optional[str],
+    api_key: Optional[str],
+    extra_payload: Optional[Dict[str, Any]],
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Return the (headers, json payload) for a generation request."""
 
     if api_key is None:
         api_key = os.getenv("BFL_API_KEY", "9f8ee884-d0e5-41e4-948b-d1e62f837c36")
@@ -43,7 +70,6 @@ def submit_generation(
     prompt_str: str
     if isinstance(prompt, (dict, list)):
         try:
-            import json
             # Prefer a compact description: if dict has scene + subjects, build human prompt
             if isinstance(prompt, dict) and "scene" in prompt and "subjects" in prompt:
                 subjects = prompt.get("subjects") or []
@@ -70,35 +96,49 @@ def submit_generation(
 
     # Add image input if provided (for image-to-image editing)
     if input_image_path and os.path.exists(input_image_path):
-        with open(input_image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode("utf-8")
-            payload["input_image"] = image_data
+        payload["input_image"] = encode_image_file(input_image_path)
 
     # add reference image
-    with open("data/inputRef.png", "rb") as ref_image_file:
-        ref_image_data = base64.b64encode(ref_image_file.read()).decode("utf-8")
-        payload["input_image1"] = ref_image_data
-    
-    with open("data/outputRef.png", "rb") as ref_output_image_file:
-        ref_image_data_out = base64.b64encode(ref_output_image_file.read()).decode("utf-8")
-        payload["input_image2"] = ref_image_data_out
-    
-
-    response = requests.post(
-        API_URL,
-        headers={
-            "accept": "application/json",
-            "x-key": api_key,
-            "Content-Type": "application/json",
-        },
-        json=payload,
+    payload["input_image1"] = _reference_image_b64("data/inputRef.png")
+    payload["input_image2"] = _reference_image_b64("data/outputRef.png")
+
+    headers = {
+        "accept": "application/json",
+        "x-key": api_key,
+        "Content-Type": "application/json",
+    }
+    return headers, payload
+
+
+def _report_failure(status: int, text: str, payload: Dict[str, Any]) -> None:
+    # Provide more debugging detail before raising
+    print("Generation request failed:")
+    print("Status:", status)
+    print("Response text:", text)
+    print("Payload sent:", payload)
+
+
+def submit_generation(
+    prompt: Union[str, Dict[str, Any], Any],
+    aspect_ratio: str = "1:1",
+    input_image_path: Optional[str] = None,
+    api_key: Optional[str] = None,
+    extra_payload: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, str]:
+    """Submit a generation/edit request and return (request_id, polling_url).
+
+    - If `input_image_path` is provided and exists, the image will be sent for image-to-image editing.
+      Callers submitting the same image repeatedly can instead pass a pre-encoded
+      `extra_payload={"input_image": ...}` and leave `input_image_path` unset.
+    - If `api_key` is None, attempts to read from environment var `BFL_API_KEY`.
+    - `extra_payload` allows passing additional parameters supported by the API.
+    """
+    headers, payload = _build_request(
+        prompt, aspect_ratio, input_image_path, api_key, extra_payload
     )
+    response = _session().post(_api_url(), headers=headers, json=payload)
     if response.status_code >= 400:
-        # Provide more debugging detail before raising
-        print("Generation request failed:")
-        print("Status:", response.status_code)
-        print("Response text:", response.text)
-        print("Payload sent:", payload)
+        _report_failure(response.status_code, response.text, payload)
     response.raise_for_status()
     data = response.json()
     request_id = data["id"]
@@ -106,6 +146,28 @@ def submit_generation(
     return request_id, polling_url
 
 
+async def submit_generation_async(
+    session: "aiohttp.ClientSession",
+    prompt: Union[str, Dict[str, Any], Any],
+    aspect_ratio: str = "1:1",
+    input_image_path: Optional[str] = None,
+    api_key: Optional[str] = None,
+    extra_payload: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, str]:
+    """Async variant of `submit_generation` that posts over a shared aiohttp session."""
+    headers, payload = _build_request(
+        prompt, aspect_ratio, input_image_path, api_key, extra_payload
+    )
+    async with session.post(_api_url(), headers=headers, json=payload) as response:
+        if response.status >= 400:
+            _report_failure(response.status, await response.text(), payload)
+        response.raise_for_status()
+        data = await response.json()
+    request_id = data["id"]
+    polling_url = data["polling_url"]
+    return request_id, polling_url
+
+
 if __name__ == "__main__":
     # Fallback script behavior for manual runs
     default_prompt = (
@@ -0,0 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# Dedicated pool for blocking file I/O in the async pipeline (input encode, upload and
+# candidate writes) so it never queues behind other work on the loop's default executor.
+# Each request does a handful of short file operations, bounded by candidate concurrency;
+# threads are only started as work arrives.
+IO_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="bfl-io")
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import uuid
 from pathlib import Path
@@ -13,12 +14,14 @@ from src.multi_generate_select import generate_and_validate_parallel, select_bes
 from src.send_to_model import _load_prompt_from_yaml
 from src.preprocess import subjects_from_image
 from src.validation import analyze_rectangles_and_empty_space
+from src.io_pool import IO_POOL
 
 app = FastAPI()
 
 WORKSPACE_ROOT = Path(__file__).resolve().parents[1]
 OUTPUT_DIR = WORKSPACE_ROOT / "output"
 CONFIG_PROMPT_PATH = WORKSPACE_ROOT / "config" / "prompt.yaml"
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
 OUTPUT_DIR.mkdir(exist_ok=True)
 app.mount("/generated", StaticFiles(directory=OUTPUT_DIR), name="generated")
 
@@ -37,6 +40,7 @@ async def generate_endpoint(
     num: int = Form(5),
     sleep: float = Form(0.75),
     timeout: float = Form(300),
+    long_poll: Optional[float] = Form(None),
 ):
     """Accepts an image upload, runs multi-candidate generation, returns best image.
 
@@ -45,6 +49,7 @@ async def generate_endpoint(
     - num: number of candidates to generate
     - sleep: polling sleep seconds
     - timeout: polling timeout seconds
+    - long_poll: optional seconds the API is asked to hold each poll open
     """
     # Save uploaded image to a temp path inside output
     if image.content_type is None or not image.content_type.startswith("image/"):
@@ -53,38 +58,36 @@ async def generate_endpoint(
     tmp_name = f"upload_{uuid.uuid4().hex}.png"
     tmp_path = OUTPUT_DIR / tmp_name
     try:
-        data = await image.read()
-        tmp_path.write_bytes(data)
+        # Stream to disk in chunks; file writes run off the event loop
+        loop = asyncio.get_running_loop()
+        with tmp_path.open("wb", buffering=UPLOAD_CHUNK_SIZE) as f:
+            while chunk := await image.read(UPLOAD_CHUNK_SIZE):
+                await loop.run_in_executor(IO_POOL, f.write, chunk)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save uploaded image: {e}")
 
-    # Load base prompt and augment with subjects from the image
+    # Analyze the original once, off the event loop; the summary feeds both
+    # the prompt subjects and the baseline rectangle count/areas
     try:
+        original_summary = await asyncio.to_thread(
+            analyze_rectangles_and_empty_space, str(tmp_path), save_artifacts=False
+        )
         prompt = _load_prompt_from_yaml(CONFIG_PROMPT_PATH)
-        subjects = subjects_from_image(str(tmp_path))
-        prompt["subjects"] = subjects
+        prompt["subjects"] = subjects_from_image(str(tmp_path), summary=original_summary)
     except Exception as e:
         # Clean up temp file on failure
         if tmp_path.exists():
             tmp_path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Failed to prepare prompt: {e}")
 
-    # Analyze original for baseline rectangle count and areas
-    original_rect_count: Optional[int] = None
-    original_rect_areas: Optional[list[float]] = None
-    try:
-        original_summary = analyze_rectangles_and_empty_space(str(tmp_path))
-        original_rect_count = original_summary.get("rectangle_count")
-        orig_rectangles = original_summary.get("rectangles", [])
-        original_rect_areas = [
-            r.get("area")
-            for r in orig_rectangles
-            if isinstance(r, dict) and r.get("area") is not None
-        ]
-    except Exception:
-        # non-fatal; proceed without baseline
-        original_rect_count = None
-        original_rect_areas = None
+    # Baseline rectangle count and areas from the original
+    original_rect_count: Optional[int] = original_summary.get("rectangle_count")
+    orig_rectangles = original_summary.get("rectangles", [])
+    original_rect_areas: Optional[list[float]] = [
+        r.get("area")
+        for r in orig_rectangles
+        if isinstance(r, dict) and r.get("area") is not None
+    ]
 
     api_key = os.getenv("BFL_API_KEY")
 
@@ -99,6 +102,7 @@ async def generate_endpoint(
             timeout_seconds=timeout,
             output_dir=OUTPUT_DIR,
             count=num,
+            long_poll_seconds=long_poll,
         )
         best = select_best(candidates, original_rect_count, original_rect_areas)
     except Exception as e:
@@ -4,54 +4,96 @@ import json
 import time
 import argparse
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional
 
-from src.flux_generate import submit_generation
+import aiohttp
+import numpy as np
+
+from src.flux_generate import submit_generation_async, encode_image_file
 from src.poll_results import poll_until_ready
 from src.validation import analyze_rectangles_and_empty_space
-from src.send_to_model import _load_prompt_from_yaml, _load_image_from_yaml, _save_image
+from src.send_to_model import _load_prompt_from_yaml, _load_image_from_yaml, _save_image_async
 from src.preprocess import subjects_from_image
+from src.io_pool import IO_POOL
+
+_VALIDATION_POOL: Optional[ProcessPoolExecutor] = None
+# Slack on top of the polling timeout for submit, download and validation
+CANDIDATE_DEADLINE_SLACK_SECONDS = 30.0
+
+
+def _init_validation_worker() -> None:
+    """Limit each validation worker to one OpenCV thread; the pool already runs one worker per CPU."""
+    import cv2
+
+    cv2.setNumThreads(1)
+
+
+def _validation_pool() -> ProcessPoolExecutor:
+    """Return the process pool for CPU-bound validation, creating it on first use.
+
+    Workers are started by a forkserver (spawn where it is unavailable, e.g. Windows) rather
+    than forked from this (threaded) process, which could leave a child holding a lock
+    copied mid-acquire.
+    """
+    global _VALIDATION_POOL
+    if _VALIDATION_POOL is None:
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _VALIDATION_POOL = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_validation_worker,
+        )
+    return _VALIDATION_POOL
+
 
 async def generate_single_candidate(
     index: int,
     prompt: str,
     aspect_ratio: str,
-    input_image_path: Optional[Path],
+    input_image_b64: Optional[str],
     api_key: Optional[str],
     sleep_seconds: float,
     timeout_seconds: float,
     output_dir: Path,
     loop,
+    session: aiohttp.ClientSession,
+    long_poll_seconds: Optional[float] = None,
 ) -> Dict[str, Any]:
-    """Generate and validate a single candidate image."""
+    """Generate and validate a single candidate image.
+
+    `input_image_b64` is the already base64-encoded input image, shared by all candidates.
+    `session` is the aiohttp.ClientSession shared by all candidates for submit, polling and download.
+    `long_poll_seconds` is forwarded to `poll_until_ready` to request server-side long polling.
+    """
     print(f"\n=== Generating candidate {index} ===")
     try:
-        # Submit generation in thread pool to avoid blocking
-        request_id, polling_url = await loop.run_in_executor(
-            None,
-            submit_generation,
+        request_id, polling_url = await submit_generation_async(
+            session,
             prompt,
             aspect_ratio,
-            str(input_image_path) if input_image_path else None,
+            None,
             api_key,
+            {"input_image": input_image_b64} if input_image_b64 else None,
         )
         print(f"Candidate {index} - Request ID: {request_id}")
 
         def progress_cb(status: str, _data):
             print(f"Candidate {index} - Status: {status}")
 
-        # Poll for results in thread pool to avoid blocking
-        result = await loop.run_in_executor(
-            None,
-            poll_until_ready,
+        # Poll for results on the event loop; no thread is held while waiting
+        result = await poll_until_ready(
             polling_url,
             request_id,
             api_key,
             sleep_seconds,
             timeout_seconds,
             progress_cb,
+            session=session,
+            long_poll_seconds=long_poll_seconds,
         )
         
         sample = result.get("result", {}).get("sample")
@@ -63,22 +105,24 @@ async def generate_single_candidate(
                 "error": "No sample in API response"
             }
         
-        # Save image in thread pool
-        saved_path = await loop.run_in_executor(
-            None,
-            _save_image,
+        saved_path = await _save_image_async(
             sample,
             output_dir,
             f"flux_candidate_{index}",
+            session,
         )
         print(f"Candidate {index} saved to: {saved_path}")
         
-        # Run validation in thread pool
+        # Run validation in a worker process; OpenCV analysis is CPU-bound
         try:
             summary = await loop.run_in_executor(
-                None,
-                analyze_rectangles_and_empty_space,
-                str(saved_path),
+                _validation_pool(),
+                functools.partial(
+                    analyze_rectangles_and_empty_space,
+                    str(saved_path),
+                    save_artifacts=False,
+                    verbose=False,
+                ),
             )
             rectangles = summary.get("rectangles", [])
             rect_areas = [r.get("area") for r in rectangles if isinstance(r, dict) and r.get("area") is not None]
@@ -116,32 +160,69 @@ async def generate_and_validate_parallel(
     timeout_seconds: float,
     output_dir: Path,
     count: int,
+    max_concurrency: int = 5,
+    long_poll_seconds: Optional[float] = None,
 ) -> List[Dict[str, Any]]:
-    """Generate multiple candidate images in parallel, validate each, and return metrics list."""
+    """Generate multiple candidate images in parallel, validate each, and return metrics list.
+
+    At most `max_concurrency` candidates are in flight at once to stay within provider rate limits.
+    With `long_poll_seconds`, each poll asks the server to hold the request open that long.
+    """
     print(f"Submitting {count} generation requests in parallel...")
     
     loop = asyncio.get_event_loop()
+
+    # Read and encode the input image once instead of once per candidate
+    input_image_b64: Optional[str] = None
+    if input_image_path and input_image_path.exists():
+        input_image_b64 = await loop.run_in_executor(IO_POOL, encode_image_file, input_image_path)
     
-    # Create tasks for all candidates
-    tasks = [
-        generate_single_candidate(
-            index=i,
-            prompt=prompt,
-            aspect_ratio=aspect_ratio,
-            input_image_path=input_image_path,
-            api_key=api_key,
-            sleep_seconds=sleep_seconds,
-            timeout_seconds=timeout_seconds,
-            output_dir=output_dir,
-            loop=loop,
-        )
-        for i in range(1, count + 1)
-    ]
-    
-    # Run all tasks concurrently
-    candidates = await asyncio.gather(*tasks)
-    
-    return list(candidates)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bounded(index, candidate):
+        async with semaphore:
+            # Hard per-candidate deadline so a hung submit or download cannot hold a slot forever
+            try:
+                return await asyncio.wait_for(
+                    candidate, timeout=timeout_seconds + CANDIDATE_DEADLINE_SLACK_SECONDS
+                )
+            except asyncio.TimeoutError:
+                print(f"Candidate {index} timed out")
+                return {"index": index, "path": None, "error": "timeout"}
+
+    # One keep-alive pool for every submit, poll and download; each request is
+    # also bounded so a hung connection cannot stall a candidate indefinitely
+    connector = aiohttp.TCPConnector(limit_per_host=20, keepalive_timeout=30)
+    request_timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+    async with aiohttp.ClientSession(connector=connector, timeout=request_timeout) as session:
+        # Create tasks for all candidates
+        tasks = [
+            bounded(i, generate_single_candidate(
+                index=i,
+                prompt=prompt,
+                aspect_ratio=aspect_ratio,
+                input_image_b64=input_image_b64,
+                api_key=api_key,
+                sleep_seconds=sleep_seconds,
+                timeout_seconds=timeout_seconds,
+                output_dir=output_dir,
+                loop=loop,
+                session=session,
+                long_poll_seconds=long_poll_seconds,
+            ))
+            for i in range(1, count + 1)
+        ]
+
+        # Run all tasks concurrently; one failing candidate must not discard the rest
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    candidates = []
+    for i, result in enumerate(results, start=1):
+        if isinstance(result, BaseException):
+            print(f"Generation failed for candidate {i}: {result}")
+            result = {"index": i, "path": None, "error": str(result)}
+        candidates.append(result)
+    return candidates
 
 
 def generate_and_validate(
@@ -153,6 +234,8 @@ def generate_and_validate(
     timeout_seconds: float,
     output_dir: Path,
     count: int,
+    max_concurrency: int = 5,
+    long_poll_seconds: Optional[float] = None,
 ) -> List[Dict[str, Any]]:
     """Generate multiple candidate images in parallel, validate each, and return metrics list."""
     return asyncio.run(
@@ -165,32 +248,38 @@ def generate_and_validate(
             timeout_seconds=timeout_seconds,
             output_dir=output_dir,
             count=count,
+            max_concurrency=max_concurrency,
+            long_poll_seconds=long_poll_seconds,
         )
     )
 
 
-def _size_match_score(orig_areas: List[float], cand_areas: List[float]) -> float:
-    """Compute a size-match score: lower is better (mean relative difference).
+def _size_match_scores(orig_sorted: np.ndarray, cand_areas: List[List[float]]) -> np.ndarray:
+    """Compute size-match scores for all candidates at once: lower is better (mean relative difference).
 
-    - Sort both lists and compare up to min length.
+    - `orig_sorted` is the original areas as an ascending float64 array (sorted once by the caller).
+    - Each candidate's areas are sorted and compared to the original up to the shorter length.
     - If lengths differ, penalize by adding 1.0 per missing/excess element.
+    - Candidates with no areas (or an empty original) score inf.
     """
-    if not orig_areas or not cand_areas:
-        return float("inf")
-    a = sorted([float(x) for x in orig_areas])
-    b = sorted([float(x) for x in cand_areas])
-    n = min(len(a), len(b))
-    if n == 0:
-        return float("inf")
-    diffs = []
-    for i in range(n):
-        oa, ca = a[i], b[i]
-        if oa <= 0:
-            diffs.append(1.0)
-        else:
-            diffs.append(abs(ca - oa) / oa)
-    penalty = abs(len(a) - len(b)) * 1.0
-    return (sum(diffs) / n) + penalty
+    scores = np.full(len(cand_areas), np.inf)
+    k = orig_sorted.size
+    if k == 0 or not cand_areas:
+        return scores
+    # Row per candidate, NaN-padded past the compared prefix
+    cand = np.full((len(cand_areas), k), np.nan)
+    lengths = np.zeros(len(cand_areas), dtype=np.int64)
+    for row, areas in enumerate(cand_areas):
+        areas_sorted = np.sort(np.asarray(areas, dtype=np.float64))
+        lengths[row] = areas_sorted.size
+        cand[row, :min(k, areas_sorted.size)] = areas_sorted[:k]
+    positive = orig_sorted > 0
+    diffs = np.where(positive, np.abs(cand - orig_sorted) / np.where(positive, orig_sorted, 1.0), 1.0)
+    diffs[np.isnan(cand)] = np.nan
+    has_areas = lengths > 0
+    penalty = np.abs(k - lengths).astype(np.float64)
+    scores[has_areas] = np.nanmean(diffs[has_areas], axis=1) + penalty[has_areas]
+    return scores
 
 
 def select_best(
@@ -207,18 +296,18 @@ def select_best(
     if not valid:
         return None
 
-    def sort_key(c: Dict[str, Any]) -> Tuple[float, int, float]:
-        empty = float(c.get("empty_percentage", float("inf")))
-        count_mismatch = 0
-        if original_rect_count is not None:
-            count_mismatch = 0 if c.get("rectangle_count") == original_rect_count else 1
-        size_score = float("inf")
-        if original_rect_areas:
-            size_score = _size_match_score(original_rect_areas, c.get("rect_areas", []))
-        return (empty, count_mismatch, size_score)
+    empties = np.array([float(c["empty_percentage"]) for c in valid])
+    count_mismatches = np.zeros(len(valid), dtype=np.int64)
+    if original_rect_count is not None:
+        count_mismatches = np.array([c.get("rectangle_count") != original_rect_count for c in valid], dtype=np.int64)
+    size_scores = np.full(len(valid), np.inf)
+    if original_rect_areas:
+        orig_sorted = np.sort(np.asarray(original_rect_areas, dtype=np.float64))
+        size_scores = _size_match_scores(orig_sorted, [c.get("rect_areas", []) for c in valid])
 
-    best = min(valid, key=sort_key)
-    return best
+    # lexsort keys are least- to most-significant; it is stable, so ties keep candidate order
+    best_idx = int(np.lexsort((size_scores, count_mismatches, empties))[0])
+    return valid[best_idx]
 
 
 def main():
@@ -230,6 +319,8 @@ def main():
     parser.add_argument("--sleep", type=float, default=0.75, help="Polling sleep seconds")
     parser.add_argument("--timeout", type=float, default=300, help="Polling timeout seconds")
     parser.add_argument("--output", type=str, default="output", help="Output directory")
+    parser.add_argument("--concurrency", type=int, default=5, help="Maximum candidates in flight at once")
+    parser.add_argument("--long-poll", type=float, default=None, help="Ask the API to hold each poll open this many seconds")
     args = parser.parse_args()
 
     workspace_root = Path(__file__).resolve().parents[1]
@@ -249,25 +340,21 @@ def main():
     else:
         raise ValueError("Input image path must be provided and exist.")
     
-    subjects = subjects_from_image(str(input_image_path))  # Just to ensure preprocessing works
+    # Analyze the original once; the summary feeds both the prompt subjects
+    # and the baseline shape count/areas used for selection
+    print("Analyzing original image for baseline shape count...")
+    original_summary = analyze_rectangles_and_empty_space(str(input_image_path), save_artifacts=False)
+    subjects = subjects_from_image(str(input_image_path), summary=original_summary)
     prompt['subjects'] = subjects
 
     api_key = os.getenv("BFL_API_KEY")
     output_dir = workspace_root / args.output
     output_dir.mkdir(exist_ok=True)
 
-    original_rect_count: Optional[int] = None
-    original_rect_areas: Optional[List[float]] = None
-    if input_image_path and input_image_path.exists():
-        try:
-            print("Analyzing original image for baseline shape count...")
-            original_summary = analyze_rectangles_and_empty_space(str(input_image_path))
-            original_rect_count = original_summary.get("rectangle_count")
-            orig_rectangles = original_summary.get("rectangles", [])
-            original_rect_areas = [r.get("area") for r in orig_rectangles if isinstance(r, dict) and r.get("area") is not None]
-            print(f"Original rectangle count: {original_rect_count}")
-        except Exception as e:
-            print(f"Failed to analyze original image: {e}")
+    original_rect_count: Optional[int] = original_summary.get("rectangle_count")
+    orig_rectangles = original_summary.get("rectangles", [])
+    original_rect_areas: Optional[List[float]] = [r.get("area") for r in orig_rectangles if isinstance(r, dict) and r.get("area") is not None]
+    print(f"Original rectangle count: {original_rect_count}")
 
     candidates = generate_and_validate(
         prompt=prompt,
@@ -278,6 +365,8 @@ def main():
         timeout_seconds=args.timeout,
         output_dir=output_dir,
         count=args.num,
+        max_concurrency=args.concurrency,
+        long_poll_seconds=args.long_poll,
     )
 
     best = select_best(candidates, original_rect_count, original_rect_areas)
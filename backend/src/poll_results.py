@@ -1,44 +1,114 @@
 import os
 import time
-import requests
-from typing import Callable, Optional, Dict, Any
+import random
+import asyncio
+from typing import TYPE_CHECKING, Callable, Optional, Dict, Any
 
+if TYPE_CHECKING:
+    import aiohttp
 
-def poll_until_ready(
+
+# Throttling/unavailable responses are retried after `Retry-After` (or the backoff delay)
+RETRYABLE_STATUSES = {429, 503}
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a delay-seconds `Retry-After` header; HTTP-date values are ignored."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+async def poll_until_ready(
     polling_url: str,
     request_id: str,
     api_key: Optional[str] = None,
     sleep_seconds: float = 0.5,
     timeout_seconds: Optional[float] = 300.0,
     on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    max_sleep_seconds: float = 2.0,
+    session: Optional["aiohttp.ClientSession"] = None,
+    long_poll_seconds: Optional[float] = None,
 ) -> Dict[str, Any]:
     """Poll the API until the result is ready or fails.
 
     Returns the JSON response dict when status == "Ready" or raises an exception on failure/timeout.
     `on_progress(status, data)` is called on each poll iteration if provided.
+    The delay starts at `sleep_seconds` and backs off by 1.5x (with up to 10% jitter) while the
+    status is unchanged, capped at `max_sleep_seconds`; it resets whenever the status changes.
+    A numeric `Retry-After` response header overrides the next delay (never below `sleep_seconds`);
+    429 and 503 responses are retried after it (or the backoff delay) instead of failing.
+    No sleep runs past `timeout_seconds`: once the budget is used up, TimeoutError is raised.
+    Pass a shared `session` to poll many requests concurrently over one connection pool;
+    otherwise a temporary session is opened for this call.
+    With `long_poll_seconds`, each request asks the server to hold it open via a `wait` query
+    parameter; while the server does hold requests, the next poll is sent without sleeping.
     """
 
+    import aiohttp
+
+    if session is None:
+        async with aiohttp.ClientSession() as own_session:
+            return await poll_until_ready(
+                polling_url,
+                request_id,
+                api_key,
+                sleep_seconds,
+                timeout_seconds,
+                on_progress,
+                max_sleep_seconds,
+                session=own_session,
+                long_poll_seconds=long_poll_seconds,
+            )
+
     if api_key is None:
         api_key = os.getenv("BFL_API_KEY", "9f8ee884-d0e5-41e4-948b-d1e62f837c36")
 
     start_time = time.time()
+    delay = sleep_seconds
+    last_status: Optional[str] = None
+    params = {"id": request_id}
+    if long_poll_seconds:
+        params["wait"] = str(long_poll_seconds)
+    held = False
     while True:
-        if timeout_seconds is not None and (time.time() - start_time) > timeout_seconds:
+        remaining = None if timeout_seconds is None else timeout_seconds - (time.time() - start_time)
+        if remaining is not None and remaining <= 0:
             raise TimeoutError("Polling timed out before result was ready.")
 
-        time.sleep(sleep_seconds)
-        response = requests.get(
+        if not held:
+            pause = delay + random.uniform(0, delay * 0.1)
+            if remaining is not None and pause >= remaining:
+                # The next poll would land past the deadline; wait out the budget and stop
+                await asyncio.sleep(remaining)
+                raise TimeoutError("Polling timed out before result was ready.")
+            await asyncio.sleep(pause)
+        request_start = time.time()
+        async with session.get(
             polling_url,
             headers={
                 "accept": "application/json",
                 "x-key": api_key,
             },
-            params={
-                "id": request_id,
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
+            params=params,
+        ) as response:
+            retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+            throttled = response.status in RETRYABLE_STATUSES
+            if not throttled:
+                response.raise_for_status()
+                data = await response.json()
+        if throttled:
+            if retry_after is not None:
+                delay = max(sleep_seconds, retry_after)
+            else:
+                delay = min(max_sleep_seconds, delay * 1.5)
+            held = False
+            continue
+        # A server that ignores `wait` answers immediately, so fall back to sleeping between polls
+        held = bool(long_poll_seconds) and (time.time() - request_start) >= long_poll_seconds / 2
         status = data.get("status", "Unknown")
 
         if on_progress:
@@ -49,6 +119,15 @@ def poll_until_ready(
         if status in {"Error", "Failed"}:
             raise RuntimeError(f"Generation failed: {data}")
 
+        if status != last_status:
+            delay = sleep_seconds
+            last_status = status
+        else:
+            delay = min(max_sleep_seconds, delay * 1.5)
+        if retry_after is not None:
+            delay = max(sleep_seconds, retry_after)
+            held = False
+
 
 if __name__ == "__main__":
     # Backwards compatible CLI behavior: read from files and print progress
@@ -61,7 +140,9 @@ if __name__ == "__main__":
         print(f"Status: {status}")
 
     try:
-        result = poll_until_ready(polling_url, request_id, on_progress=_print_progress)
+        result = asyncio.run(
+            poll_until_ready(polling_url, request_id, on_progress=_print_progress)
+        )
         print(f"Result: {result['result']['sample']}")
     except Exception as e:
         print(f"Generation failed: {e}")
\ No newline at end of file
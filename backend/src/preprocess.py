@@ -1,6 +1,6 @@
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 
 from src.validation import analyze_rectangles_and_empty_space
 
@@ -28,12 +28,15 @@ def size_label(area: int, total_pixels: int) -> str:
 	return "small"
 
 
-def subjects_from_image(image_path: str) -> List[Dict[str, Any]]:
+def subjects_from_image(image_path: str, summary: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
 	"""Extract subjects list from an image using rectangle analysis.
 
 	Each subject dict: {"type": "box", "color": "#RRGGBB", "size": "large|medium|small", "area": int}
+	Pass a `summary` already returned by `analyze_rectangles_and_empty_space` for this
+	image to avoid analyzing it a second time.
 	"""
-	summary = analyze_rectangles_and_empty_space(image_path)
+	if summary is None:
+		summary = analyze_rectangles_and_empty_space(image_path)
 	rects = summary.get("rectangles", [])
 	total_pixels = summary.get("total_pixels", 1)
 	subjects: List[Dict[str, Any]] = []
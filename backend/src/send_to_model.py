@@ -1,19 +1,23 @@
 import os
 import sys
+import asyncio
 import time
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import requests
-import yaml
 from src.flux_generate import submit_generation
 from src.poll_results import poll_until_ready
+from src.io_pool import IO_POOL
+
+if TYPE_CHECKING:
+	import aiohttp
 
 
 def _load_prompt_from_yaml(yaml_path: Path) -> Optional[str]:
 
 	if not yaml_path.exists():
 		return None
+	import yaml
 	data = yaml.safe_load(yaml_path.read_text())
 	return data.get("prompt") if isinstance(data, dict) else None
 
@@ -21,6 +25,7 @@ def _load_image_from_yaml(yaml_path: Path) -> Optional[str]:
 
     if not yaml_path.exists():
         return None
+    import yaml
     data = yaml.safe_load(yaml_path.read_text())
     return data.get("image") if isinstance(data, dict) else None
 
@@ -31,6 +36,7 @@ def _save_image(sample: str, output_dir: Path, filename_prefix: str = "flux_resu
 	out_path = output_dir / f"{filename_prefix}_{ts}.png"
 
 	if sample.startswith("http://") or sample.startswith("https://"):
+		import requests
 		resp = requests.get(sample)
 		resp.raise_for_status()
 		out_path.write_bytes(resp.content)
@@ -48,6 +54,27 @@ def _save_image(sample: str, output_dir: Path, filename_prefix: str = "flux_resu
 		return out_path
 
 
+async def _save_image_async(
+	sample: str,
+	output_dir: Path,
+	filename_prefix: str,
+	session: "aiohttp.ClientSession",
+) -> Path:
+	"""Like `_save_image`, but downloads URL samples over a shared aiohttp session."""
+	if not (sample.startswith("http://") or sample.startswith("https://")):
+		# base64 samples need no network; decoding inline is cheap
+		return _save_image(sample, output_dir, filename_prefix)
+
+	output_dir.mkdir(exist_ok=True)
+	ts = time.strftime("%Y%m%d_%H%M%S")
+	out_path = output_dir / f"{filename_prefix}_{ts}.png"
+	async with session.get(sample) as resp:
+		resp.raise_for_status()
+		data = await resp.read()
+	await asyncio.get_running_loop().run_in_executor(IO_POOL, out_path.write_bytes, data)
+	return out_path
+
+
 def main():
 	workspace_root = Path(__file__).resolve().parents[1]
 	config_prompt_path = workspace_root / "config" / "prompt.yaml"
@@ -74,14 +101,14 @@ def main():
 	def progress_cb(status: str, _data):
 		print(f"Status: {status}")
 
-	result = poll_until_ready(
+	result = asyncio.run(poll_until_ready(
 		polling_url=polling_url,
 		request_id=request_id,
 		api_key=api_key,
 		sleep_seconds=0.75,
 		timeout_seconds=300,
 		on_progress=progress_cb,
-	)
+	))
 
 	sample = result.get("result", {}).get("sample")
 	if not sample:
@@ -3,6 +3,10 @@ import numpy as np
 import csv
 import glob
 
+# Edge detection runs on a copy downscaled to at most this many pixels on the long side.
+# Kept above FLUX output sizes (up to ~1440 px) so candidates are analyzed at full resolution
+MAX_EDGE_DETECT_SIZE = 2048
+
 def load_image(image_path):
     img = cv2.imread(image_path)
     if img is None:
@@ -19,6 +23,11 @@ def find_quadrilateral_rectangles(edges, total_pixels, area_min=500, area_max_ra
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     rect_bboxes = []
     for cnt in contours:
+        # The approximated quad lies inside the contour's own bounding rect, so
+        # contours whose rect is already too small can skip approxPolyDP
+        _, _, cw, ch = cv2.boundingRect(cnt)
+        if cw * ch < area_min:
+            continue
         peri = cv2.arcLength(cnt, True)
         approx = cv2.approxPolyDP(cnt, 0.02 * peri, True)
         if len(approx) == 4:
@@ -27,31 +36,35 @@ def find_quadrilateral_rectangles(edges, total_pixels, area_min=500, area_max_ra
             if area < area_min or area > (total_pixels * area_max_ratio):
                 continue
             rect_bboxes.append((x, y, w, h))
-    return rect_bboxes
-
-def dominant_color_rgb(roi_bgr):
-    pixels = roi_bgr.reshape(-1, 3).astype(np.float32)
-    _, _, centers = cv2.kmeans(
-        pixels,
-        1,
-        None,
-        (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0),
-        10,
-        cv2.KMEANS_RANDOM_CENTERS,
-    )
-    dominant_bgr = centers[0].astype(int).flatten()
-    return tuple(dominant_bgr[::-1])  # RGB
-
-def annotate_and_collect(img, original, bboxes, total_pixels):
+    # (N, 4) int32 array of x, y, w, h rows
+    return np.asarray(rect_bboxes, dtype=np.int32).reshape(-1, 4)
+
+def dominant_colors_rgb(img, bboxes):
+    """Mean color of every bbox as an (N, 3) int32 RGB array.
+
+    Single-cluster k-means converges to the mean, so each ROI is summed in O(1)
+    from one integral image instead of being reduced separately.
+    """
+    if len(bboxes) == 0:
+        return np.zeros((0, 3), dtype=np.int32)
     height, width = img.shape[:2]
-    mask = np.zeros((height, width), dtype=np.uint8)
+    integral = cv2.integral(img, sdepth=cv2.CV_64F)
+    x0, y0 = bboxes[:, 0], bboxes[:, 1]
+    x1 = np.minimum(x0 + bboxes[:, 2], width)
+    y1 = np.minimum(y0 + bboxes[:, 3], height)
+    sums = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    means_bgr = sums / ((x1 - x0) * (y1 - y0))[:, None]
+    return means_bgr.astype(np.int32)[:, ::-1]  # RGB
+
+def collect_rectangles(img, bboxes, total_pixels, verbose=True):
     rectangles = []
-    print(f"{'ID':<4} {'Area (px²)':<12} {'Width':<8} {'Height':<8} {'Color (RGB)':<15} {'% of Image'}")
-    print("-" * 75)
-    for i, (x, y, w, h) in enumerate(bboxes, start=1):
-        area = w * h
-        roi = original[y:y+h, x:x+w]
-        color_rgb = dominant_color_rgb(roi)
+    if verbose:
+        print(f"{'ID':<4} {'Area (px²)':<12} {'Width':<8} {'Height':<8} {'Color (RGB)':<15} {'% of Image'}")
+        print("-" * 75)
+    areas = bboxes[:, 2] * bboxes[:, 3]
+    colors = dominant_colors_rgb(img, bboxes).tolist()
+    for i, ((x, y, w, h), area, color) in enumerate(zip(bboxes.tolist(), areas.tolist(), colors), start=1):
+        color_rgb = tuple(color)
         rectangles.append({
             'id': i,
             'area': area,
@@ -60,37 +73,48 @@ def annotate_and_collect(img, original, bboxes, total_pixels):
             'color_rgb': color_rgb,
             'bbox': (x, y, w, h)
         })
-        cv2.rectangle(mask, (x, y), (x + w, y + h), 255, -1)
-        percent = (area / total_pixels) * 100
-        print(f"{i:<4} {area:<12} {w:<8} {h:<8} {str(color_rgb):<15} {percent:.2f}%")
+        if verbose:
+            percent = (area / total_pixels) * 100
+            print(f"{i:<4} {area:<12} {w:<8} {h:<8} {str(color_rgb):<15} {percent:.2f}%")
+    return rectangles
+
+def build_mask(bboxes, shape):
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    # Inclusive of the far edge, matching a filled cv2.rectangle
+    for x, y, w, h in bboxes.tolist():
+        mask[y:y+h+1, x:x+w+1] = 255
+    return mask
+
+def draw_annotations(img, bboxes):
+    for i, (x, y, w, h) in enumerate(bboxes.tolist(), start=1):
         cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 3)
         cv2.putText(img, str(i), (x + 5, y + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-    return rectangles, mask
 
-def calculate_bounding_box_of_all_rectangles(rectangles):
-    """Calculate the bounding box that contains all detected rectangles."""
-    if not rectangles:
+def calculate_bounding_box_of_all_rectangles(bboxes):
+    """Calculate the bounding box that contains all detected rectangles.
+
+    `bboxes` is the (N, 4) array of x, y, w, h rows from find_quadrilateral_rectangles.
+    """
+    if len(bboxes) == 0:
         return None
     
-    min_x = min(r['bbox'][0] for r in rectangles)
-    min_y = min(r['bbox'][1] for r in rectangles)
-    max_x = max(r['bbox'][0] + r['bbox'][2] for r in rectangles)
-    max_y = max(r['bbox'][1] + r['bbox'][3] for r in rectangles)
+    min_x, min_y = bboxes[:, :2].min(axis=0).tolist()
+    max_x, max_y = (bboxes[:, :2] + bboxes[:, 2:]).max(axis=0).tolist()
     
     return (min_x, min_y, max_x - min_x, max_y - min_y)
 
-def summarize_and_label(img, mask, rectangles, total_pixels):
-    height, width = img.shape[:2]
-    real_occupied_pixels = int(np.sum(mask == 255))
+def summarize_and_label(img, mask, rectangles, bboxes, total_pixels, verbose=True):
+    height, width = mask.shape[:2]
+    real_occupied_pixels = int(np.count_nonzero(mask))
     
     # Calculate gaps only within the bounding box of all rectangles
-    bbox = calculate_bounding_box_of_all_rectangles(rectangles)
+    bbox = calculate_bounding_box_of_all_rectangles(bboxes)
     if bbox:
         x, y, w, h = bbox
         # Create a mask of only the region containing rectangles
         roi_mask = mask[y:y+h, x:x+w]
         content_area_pixels = w * h
-        occupied_in_content = int(np.sum(roi_mask == 255))
+        occupied_in_content = int(np.count_nonzero(roi_mask))
         gap_pixels = content_area_pixels - occupied_in_content
         gap_percentage = (gap_pixels / content_area_pixels) * 100 if content_area_pixels > 0 else 0
     else:
@@ -102,25 +126,26 @@ def summarize_and_label(img, mask, rectangles, total_pixels):
     empty_pixels = total_pixels - real_occupied_pixels
     empty_percentage = (empty_pixels / total_pixels) * 100
     
-    print("=" * 75)
-    print(f"Image resolution          : {width} × {height} = {total_pixels:,} pixels")
-    print(f"Detected rectangles       : {len(rectangles)}")
-    print(f"Pixels covered (no overlap): {real_occupied_pixels:,}")
-    if bbox:
-        print(f"Content area (bbox)       : {content_area_pixels:,} pixels")
-        print(f"Gap pixels (excl borders) : {gap_pixels:,}")
-        print(f"Gap percentage (excl borders): {gap_percentage:.2f}%")
-    print(f"Total empty pixels (incl borders): {empty_pixels:,}")
-    print(f"Total empty percentage    : {empty_percentage:.2f}%")
-    print(f"Filled percentage         : {100 - empty_percentage:.2f}%")
+    if verbose:
+        print("=" * 75)
+        print(f"Image resolution          : {width} × {height} = {total_pixels:,} pixels")
+        print(f"Detected rectangles       : {len(rectangles)}")
+        print(f"Pixels covered (no overlap): {real_occupied_pixels:,}")
+        if bbox:
+            print(f"Content area (bbox)       : {content_area_pixels:,} pixels")
+            print(f"Gap pixels (excl borders) : {gap_pixels:,}")
+            print(f"Gap percentage (excl borders): {gap_percentage:.2f}%")
+        print(f"Total empty pixels (incl borders): {empty_pixels:,}")
+        print(f"Total empty percentage    : {empty_percentage:.2f}%")
+        print(f"Filled percentage         : {100 - empty_percentage:.2f}%")
     
     # Update label to show gap without borders
-    if bbox:
-        cv2.putText(img, f"Gaps: {gap_pixels:,} px ({gap_percentage:.1f}%)",
-                    (10, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
-    else:
-        cv2.putText(img, f"Empty: {empty_pixels:,} px ({empty_percentage:.1f}%)",
-                    (10, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+    if img is not None:
+        if bbox:
+            label = f"Gaps: {gap_pixels:,} px ({gap_percentage:.1f}%)"
+        else:
+            label = f"Empty: {empty_pixels:,} px ({empty_percentage:.1f}%)"
+        cv2.putText(img, label, (10, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
     
     return {
         'total_pixels': total_pixels,
@@ -150,16 +175,41 @@ def save_outputs(image_path, img, mask, rectangles, total_pixels):
     print("   → output/mask_occupied_areas.jpg")
     print("   → output/rectangle_report.csv")
 
-def analyze_rectangles_and_empty_space(image_path):
+def analyze_rectangles_and_empty_space(image_path, save_artifacts=True, verbose=True):
+    """Detect rectangles in an image and measure the empty space around them.
+
+    `save_artifacts=False` skips writing the labeled image, mask and CSV report;
+    `verbose=False` suppresses the per-rectangle table and summary printout.
+    """
     img = load_image(image_path)
-    original = img.copy()
     height, width = img.shape[:2]
     total_pixels = width * height
-    edges = preprocess_edges(img)
-    bboxes = find_quadrilateral_rectangles(edges, total_pixels)
-    rectangles, mask = annotate_and_collect(img, original, bboxes, total_pixels)
-    summary = summarize_and_label(img, mask, rectangles, total_pixels)
-    save_outputs(image_path, img, mask, rectangles, total_pixels)
+    scale = MAX_EDGE_DETECT_SIZE / max(height, width)
+    if scale < 1:
+        # Only approximate bboxes are needed, so detect on a downscaled copy
+        small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        small_h, small_w = small.shape[:2]
+        edges = preprocess_edges(small)
+        bboxes = find_quadrilateral_rectangles(
+            edges, small_w * small_h, area_min=500 * scale * scale
+        )
+        bboxes = np.rint(bboxes / scale).astype(np.int32)
+        bboxes[:, 2] = np.minimum(bboxes[:, 2], width - bboxes[:, 0])
+        bboxes[:, 3] = np.minimum(bboxes[:, 3], height - bboxes[:, 1])
+    else:
+        edges = preprocess_edges(img)
+        bboxes = find_quadrilateral_rectangles(edges, total_pixels)
+    rectangles = collect_rectangles(img, bboxes, total_pixels, verbose)
+    mask = build_mask(bboxes, img.shape)
+    # Colors are sampled from `img`, so annotations go on a clone that is only
+    # needed when the labeled image is saved
+    canvas = None
+    if save_artifacts:
+        canvas = img.copy()
+        draw_annotations(canvas, bboxes)
+    summary = summarize_and_label(canvas, mask, rectangles, bboxes, total_pixels, verbose)
+    if save_artifacts:
+        save_outputs(image_path, canvas, mask, rectangles, total_pixels)
     return summary
 
 # ==================== RUN IT ====================
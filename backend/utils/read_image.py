@@ -1,12 +1,13 @@
 from pathlib import Path
 from typing import Union, Optional, Tuple, IO
 import numpy as np
-from PIL import Image
 from io import BytesIO
 
 try:
+    import cv2
+    from PIL import Image
 except ImportError as exc:
-    raise ImportError("Pillow is required to use read_image.py: pip install pillow") from exc
+    raise ImportError("OpenCV and Pillow are required to use read_image.py: pip install opencv-python pillow") from exc
 
 
 PathLike = Union[str, Path]
@@ -22,6 +23,15 @@ def _open_pil(source: FileLike) -> Image.Image:
     return Image.open(source)
 
 
+def _read_bytes(source: FileLike) -> bytes:
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes()
+    if isinstance(source, bytes):
+        return source
+    # assume file-like
+    return source.read()
+
+
 def read_image(
     source: FileLike,
     target_size: Optional[Tuple[int, int]] = None,
@@ -37,16 +47,20 @@ def read_image(
     Returns:
     - uint8 numpy array with shape (H, W) or (H, W, 3)
     """
-    img = _open_pil(source)
-    img = img.convert("RGB")
-
     if target_size is not None:
         # target_size is (width, height)
-        img = img.resize((int(target_size[0]), int(target_size[1])), resample=Image.BILINEAR)
-
-    arr = np.asarray(img)
-    # ensure uint8
-    if arr.dtype != np.uint8:
-        arr = (arr * 255).astype(np.uint8)
+        width, height = int(target_size[0]), int(target_size[1])
+        img = _open_pil(source)
+        # JPEG only: let the decoder downscale via DCT scaling, keeping 2x headroom for Lanczos
+        img.draft("RGB", (width * 2, height * 2))
+        img = img.convert("RGB").resize((width, height), resample=Image.LANCZOS)
+        return np.asarray(img)
 
-    return arr
\ No newline at end of file
+    # Decode straight from the encoded buffer into a single (H, W, 3) array; like the
+    # PIL path above, EXIF orientation is not applied
+    data = _read_bytes(source)
+    arr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if arr is None:
+        raise ValueError("Cannot decode image")
+    cv2.cvtColor(arr, cv2.COLOR_BGR2RGB, dst=arr)
+    return arr